@@ -1,23 +1,58 @@
 # bot.py
 import os
+import re
 import json
+import html
+import math
+import mmap
+import bisect
 import asyncio
+import hashlib
 import logging
+import itertools
+import functools
+import warnings
 from pathlib import Path
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-import feedparser
+import msgspec
+import aiohttp
+from lxml import etree
 from bs4 import BeautifulSoup
 
+# --- Optional selectolax (lexbor C parser) for HTML -> text; bs4+lxml otherwise ---
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except Exception:
+    SELECTOLAX_AVAILABLE = False
+
 # Telegram
 import telegram
 from telegram import InputMediaPhoto
+from telegram.request import HTTPXRequest
+
+# --- Optional orjson (fast JSON); stdlib json produces the same files ---
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
 
-# Pillow + HTTP
+# Pillow
 from PIL import Image, ImageOps
 from io import BytesIO
-import requests
+
+# --- Optional pyvips (libvips: streaming resize/composite); Pillow otherwise ---
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+    logging.getLogger("pyvips").setLevel(logging.WARNING)
+    if hasattr(pyvips, "block_untrusted_set"):
+        pyvips.block_untrusted_set(True)  # no SVG/PDF/... loaders on feed images
+except Exception:
+    PYVIPS_AVAILABLE = False
 
 # ====================
 # CONFIG
@@ -27,6 +62,10 @@ TZ = ZoneInfo("Africa/Casablanca")
 TELEGRAM_TOKEN   = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# Message templates
+ALBUM_TEXT_HEADER = "📰 أحدث أخبار الأنمي\n\n"  # text-only album fallback
+YOUTUBE_CAPTION   = "🎥 {title}\n{url}"
+
 # Sources
 CRUNCHYROLL_RSS_URL = "https://cr-news-api-service.prd.crunchyrollsvc.com/v1/ar-SA/rss"
 
@@ -34,6 +73,8 @@ CRUNCHYROLL_RSS_URL = "https://cr-news-api-service.prd.crunchyrollsvc.com/v1/ar-
 CHANNEL_ID         = "UC1WGYjPeHHc_3nRXqbW3OcQ"
 YOUTUBE_RSS_URL    = f"https://www.youtube.com/feeds/videos.xml?channel_id={CHANNEL_ID}"
 YOUTUBE_SENT_FILE  = Path("sent_videos.txt")
+YOUTUBE_SENT_KEEP  = 1000       # ids kept when sent_videos.txt is trimmed
+YOUTUBE_SENT_MAX_BYTES = 32_768  # trim once the file grows past this
 
 # Paths
 DATA_BASE    = Path("data")            # data/YYYY/MM/DD-MM.json
@@ -42,7 +83,17 @@ GLOBAL_INDEX = Path("global_index")    # index_1.json, index_2.json, pagination.
 # Global Index settings
 GLOBAL_PAGE_SIZE = 500  # rotate after this many items per index file
 
+
+# Sent YouTube video ids (sent_videos.txt stays as a human-readable audit log)
+YT_SENT_BLOOM_PATH       = GLOBAL_INDEX / "yt_sent.bloom"
+YT_SENT_BLOOM_CAPACITY   = 2_000
+YT_SENT_BLOOM_ERROR_RATE = 1e-3  # ~3.5 KB on disk
+
+# ETag / Last-Modified per feed URL, for conditional GETs
+FEED_VALIDATORS_PATH = GLOBAL_INDEX / "etags.json"
+
 # Logo overlay settings
+LOGO_ENABLED = True          # False: Telegram fetches post images by URL (no download/Pillow)
 LOGO_PATH = "logo.png"
 LOGO_MIN_WIDTH_RATIO = 0.10  # 10% for small images
 LOGO_MAX_WIDTH_RATIO = 0.20  # 20% for large images
@@ -52,11 +103,38 @@ LOGO_MARGIN = 10             # px margin from top-right
 MAX_IMAGE_WIDTH  = 1280
 MAX_IMAGE_HEIGHT = 1280
 JPEG_QUALITY     = 85
-HTTP_TIMEOUT     = 25
+WEBP_QUALITY     = 85  # non-JPEG sources (PNG/WEBP/GIF) are sent as WEBP
+HTTP_TIMEOUT     = 25    # whole request (feeds, images)
+HTTP_CONNECT_TIMEOUT = 3.05  # fail fast on a dead host
+HTTP_READ_TIMEOUT    = 12    # max gap between body chunks
+MAX_IMAGE_BYTES  = 8 * 1024 * 1024   # stop downloading past this
+IMAGE_FORMATS    = ("JPEG", "PNG", "WEBP", "GIF")
+ALBUM_CONCURRENCY = 3                # album images downloaded/processed at once
+
+# Processed images, keyed by source URL + logo/settings (gitignored; kept
+# across runs by the workflow's actions/cache steps)
+IMG_CACHE_DIR     = Path(".img_cache")
+IMG_CACHE_MAX_AGE = 7 * 24 * 3600    # seconds
+
+# Reject decompression bombs before decoding (raise instead of warn)
+Image.MAX_IMAGE_PIXELS = 40_000_000
+warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+# HTTP
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; Anim-bot/1.0)",
+    "Accept-Language": "ar-SA,ar;q=0.9,en;q=0.8",
+}
+
+# JSON (orjson writes UTF-8 bytes directly, like ensure_ascii=False)
+JSON_OPTIONS = (orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS) if ORJSON_AVAILABLE else None
 
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Writes queued during a run (global index), committed once by flush_pending()
+_pending_writes: dict[Path, bytes] = {}
+
 
 # ====================
 # Utils
@@ -64,8 +142,25 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 def now_local() -> datetime:
     return datetime.now(TZ)
 
+def json_dumps(data, pretty: bool = True) -> bytes:
+    """UTF-8 JSON bytes; pretty = indent 2 (file layout), else one compact line."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=JSON_OPTIONS if pretty else orjson.OPT_NON_STR_KEYS)
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_loads(raw: bytes):
+    return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+_ensured_dirs: set[Path] = set()
+
 def ensure_dir(p: Path):
+    """mkdir -p, once per directory per process."""
+    if p in _ensured_dirs:
+        return
     p.mkdir(parents=True, exist_ok=True)
+    _ensured_dirs.add(p)
 
 def daily_path(dt: datetime) -> Path:
     y, m, d = dt.year, dt.month, dt.day
@@ -74,120 +169,253 @@ def daily_path(dt: datetime) -> Path:
     # Example: data/2025/11/09-11.json
     return out_dir / f"{d:02d}-{m:02d}.json"
 
+def atomic_write_bytes(path: Path, data: bytes, fsync: bool = True):
+    """Write (+ fsync) a sibling .tmp file, then swap it in (no torn files)."""
+    ensure_dir(path.parent)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def fsync_dir(d: Path):
+    """Make renames inside d durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(d, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def queue_json(path: Path, data):
+    """Defer a JSON write until flush_pending() (last write per path wins)."""
+    _pending_writes[path] = json_dumps(data)
+
+def flush_pending():
+    """Commit all queued writes, then fsync each touched directory once."""
+    if not _pending_writes:
+        return
+    dirs = set()
+    for path, data in _pending_writes.items():
+        try:
+            atomic_write_bytes(path, data)
+            dirs.add(path.parent)
+        except Exception as e:
+            logging.error(f"Failed writing {path}: {e}")
+    _pending_writes.clear()
+    for d in dirs:
+        fsync_dir(d)
+
 def load_json_list(path: Path) -> list:
-    if not path.exists():
+    raw = _pending_writes.get(path)
+    if raw is None and not path.exists():
         return []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, list) else []
+        data = json_loads(raw if raw is not None else path.read_bytes())
+        return data if isinstance(data, list) else []
     except Exception as e:
         logging.error(f"Failed reading {path}: {e}")
         return []
 
-def save_json_list(path: Path, data: list):
-    try:
-        ensure_dir(path.parent)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logging.error(f"Failed writing {path}: {e}")
-
 
 # ====================
 # RSS extraction helpers
 # ====================
-def extract_full_text(entry) -> str:
+_IMG_SRC_RE = re.compile(r'<img\b[^>]*?\ssrc=["\']([^"\']+)', re.I)
+_CONTENT_ENCODED = "{http://purl.org/rss/1.0/modules/content/}encoded"
+_MEDIA_THUMBNAIL = "{http://search.yahoo.com/mrss/}thumbnail"
+
+def parse_rss_items(body: bytes) -> list:
     """
-    Full text without HTML:
-    - prefer content:encoded (entry.content[0].value)
-    - fallback to description
+    Stream <item>s with lxml iterparse into the same shape the helpers
+    below read (feedparser-style keys: title, content, description,
+    media_thumbnail, tags). Each item is freed once converted.
     """
+    entries = []
+    if not body:
+        return entries
     try:
-        if hasattr(entry, "content") and entry.content and isinstance(entry.content, list):
-            raw = entry.content[0].get("value") or ""
-            if raw:
-                return BeautifulSoup(raw, "html.parser").get_text(separator=" ", strip=True)
-    except Exception:
-        pass
-
-    raw = getattr(entry, "description", "") or ""
-    if raw:
-        return BeautifulSoup(raw, "html.parser").get_text(separator=" ", strip=True)
+        for _, el in etree.iterparse(BytesIO(body), events=("end",), tag="item",
+                                     recover=True, resolve_entities=False, no_network=True):
+            entry = {
+                "title": (el.findtext("title") or "").strip(),
+                "description": el.findtext("description") or "",
+            }
+            content = el.findtext(_CONTENT_ENCODED)
+            if content:
+                entry["content"] = [{"value": content}]
+            thumb = el.find(f".//{_MEDIA_THUMBNAIL}")
+            if thumb is not None and thumb.get("url"):
+                entry["media_thumbnail"] = [{"url": thumb.get("url")}]
+            entry["tags"] = [{"term": c.text.strip()} for c in el.iterfind("category")
+                             if c.text and c.text.strip()]
+            entries.append(entry)
+
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+    except etree.XMLSyntaxError as e:
+        logging.error(f"RSS parse failed: {e}")
+    return entries
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_YT_VIDEO_ID = "{http://www.youtube.com/xml/schemas/2015}videoId"
+
+def parse_youtube_latest(body: bytes) -> dict | None:
+    """First <entry> of the channel's Atom feed (newest video); stops parsing there."""
+    if not body:
+        return None
+    try:
+        for _, el in etree.iterparse(BytesIO(body), events=("end",), tag=f"{_ATOM}entry",
+                                     recover=True, resolve_entities=False, no_network=True):
+            link = el.find(f"{_ATOM}link[@rel='alternate']")
+            if link is None:
+                link = el.find(f"{_ATOM}link")
+            thumb = el.find(f".//{_MEDIA_THUMBNAIL}")
+            entry = {
+                "yt_videoid": (el.findtext(_YT_VIDEO_ID) or "").strip(),
+                "id": (el.findtext(f"{_ATOM}id") or "").strip(),
+                "title": (el.findtext(f"{_ATOM}title") or "").strip(),
+                "link": link.get("href", "") if link is not None else "",
+                "media_thumbnail": [{"url": thumb.get("url")}] if thumb is not None and thumb.get("url") else None,
+            }
+            el.clear()
+            return entry
+    except etree.XMLSyntaxError as e:
+        logging.error(f"YouTube feed parse failed: {e}")
+    return None
 
-    return ""
+def entry_html(entry) -> str:
+    """Raw entry HTML: content:encoded (entry.content[0].value), else description."""
+    content = entry.get("content")
+    if content and isinstance(content, list):
+        raw = content[0].get("value") or ""
+        if raw:
+            return raw
+    return entry.get("description") or ""
 
-def extract_image(entry) -> str | None:
+def extract_full_text(entry, raw: str | None = None) -> str:
+    """
+    Full text without HTML:
+    - prefer content:encoded (entry.content[0].value)
+    - fallback to description
+    raw: entry_html(entry) when the caller already has it.
+    """
+    if raw is None:
+        raw = entry_html(entry)
+    if not raw:
+        return ""
+    if SELECTOLAX_AVAILABLE:
+        # Same result as get_text(" ", strip=True): no script/style text,
+        # no whitespace-only nodes
+        tree = LexborHTMLParser(raw)
+        tree.strip_tags(["script", "style"])
+        parts = tree.text(separator="\x00", strip=True).split("\x00")
+        return " ".join(p for p in parts if p)
+    return BeautifulSoup(raw, "lxml").get_text(separator=" ", strip=True)
+
+def extract_image(entry, raw: str | None = None) -> str | None:
     # 1) media:thumbnail
-    if hasattr(entry, "media_thumbnail") and entry.media_thumbnail:
-        try:
-            return entry.media_thumbnail[0].get("url") or entry.media_thumbnail[0]["url"]
-        except Exception:
-            pass
-    # 2) from content/description
-    raw = ""
-    try:
-        if hasattr(entry, "content") and entry.content and isinstance(entry.content, list):
-            raw = entry.content[0].get("value") or ""
-    except Exception:
-        pass
+    mt = entry.get("media_thumbnail")
+    if mt:
+        url = mt[0].get("url")
+        if url:
+            return url
+    # 2) first <img src> in content/description (regex scan, no DOM build)
+    if raw is None:
+        raw = entry_html(entry)
     if not raw:
-        raw = getattr(entry, "description", "") or ""
-    if raw:
-        soup = BeautifulSoup(raw, "html.parser")
-        img = soup.find("img")
-        if img and img.has_attr("src"):
-            return img["src"]
+        return None
+    m = _IMG_SRC_RE.search(raw)  # compiled, case-insensitive; no copy of raw
+    if m:
+        return html.unescape(m.group(1))
     return None
 
 def extract_categories(entry) -> list:
     cats = []
-    tags = getattr(entry, "tags", None)
+    tags = entry.get("tags")
     if tags:
         for t in tags:
-            term = getattr(t, "term", None)
+            term = t.get("term")
             if term:
                 cats.append(str(term))
     return cats
 
-def build_daily_record(entry) -> dict:
+def build_daily_record(entry, image: str | None, raw: str | None = None) -> dict:
     """
     Daily record (no id/author/published/language/url):
     - title
     - description_full (plain text, full)
-    - image
+    - image (already extracted for the dedup fingerprint)
     - categories
     """
-    title = getattr(entry, "title", "") or ""
-    description_full = extract_full_text(entry)
-    image = extract_image(entry)
-    categories = extract_categories(entry)
     return {
-        "title": title,
-        "description_full": description_full,
+        "title": entry.get("title", "") or "",
+        "description_full": extract_full_text(entry, raw),
         "image": image,
-        "categories": categories
+        "categories": extract_categories(entry)
     }
 
-def get_entry_identity(entry) -> str:
+def get_entry_identity(entry, image: str | None) -> str:
     """Dedup fingerprint: title + image."""
-    title = getattr(entry, "title", "") or ""
-    image = extract_image(entry)
+    title = entry.get("title", "") or ""
     return f"{title.strip()}|{(image or '').strip()}"
 
 
 # ====================
 # Image processing (logo + resize)
 # ====================
-def fetch_image(url: str) -> Image.Image | None:
+async def download_image(session: aiohttp.ClientSession, url: str,
+                         max_bytes: int = MAX_IMAGE_BYTES) -> bytes | None:
+    """
+    Stream the body in 64 KiB chunks straight into one BytesIO; give up
+    once it exceeds max_bytes. getvalue() hands over that buffer without
+    a second full-size copy.
+    """
     try:
-        r = requests.get(url, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        im = Image.open(BytesIO(r.content))
-        im = ImageOps.exif_transpose(im)  # fix orientation
-        return im.convert("RGBA")
+        async with session.get(url) as r:
+            r.raise_for_status()
+            if (r.content_length or 0) > max_bytes:
+                raise ValueError(f"image larger than {max_bytes} bytes")
+            buf = BytesIO()
+            async for chunk in r.content.iter_chunked(64 * 1024):
+                buf.write(chunk)
+                if buf.tell() > max_bytes:
+                    raise ValueError(f"image larger than {max_bytes} bytes")
+            return buf.getvalue()
     except Exception as e:
-        logging.error(f"fetch_image failed for {url}: {e}")
+        logging.error(f"download failed for {url}: {e}")
+        return None
+
+def is_jpeg(data: bytes) -> bool:
+    """JPEG magic bytes (SOI marker); decides JPEG vs WEBP output."""
+    return data[:3] == b"\xff\xd8\xff"
+
+def open_image(data: bytes, url: str = "") -> Image.Image | None:
+    try:
+        with Image.open(BytesIO(data), formats=IMAGE_FORMATS) as im:
+            if im.format == "JPEG":
+                # Shrink-on-load: libjpeg decodes at a 1/2..1/8 DCT scale that
+                # still covers the target box (longest side, any orientation)
+                scale = max(MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT) / max(im.size)
+                if scale < 1:
+                    im.draft(None, (math.ceil(im.width * scale), math.ceil(im.height * scale)))
+            im = ImageOps.exif_transpose(im)  # fix orientation (returns a loaded copy)
+            # RGB/RGBA are composited as-is; other modes go to RGB unless
+            # they carry transparency (no 4-byte buffer for opaque sources)
+            if im.mode in ("RGB", "RGBA"):
+                return im
+            if im.mode in ("LA", "PA", "La") or "transparency" in im.info:
+                return im.convert("RGBA")
+            return im.convert("RGB")
+    except Exception as e:
+        logging.error(f"open_image failed for {url}: {e}")
         return None
 
 def downscale_to_fit(im: Image.Image) -> Image.Image:
@@ -203,120 +431,539 @@ def downscale_to_fit(im: Image.Image) -> Image.Image:
         im = im.resize((new_w, new_h), Image.LANCZOS)
     return im
 
-def overlay_logo(im: Image.Image) -> Image.Image:
-    """Overlay logo top-right with adaptive size."""
+def logo_width(pw: int) -> int:
+    """Adaptive logo width for a post image pw pixels wide."""
+    lw_ratio = LOGO_MIN_WIDTH_RATIO if pw < 600 else LOGO_MAX_WIDTH_RATIO
+    return int(max(1, min(pw - 2 * LOGO_MARGIN, pw * lw_ratio)))
+
+@functools.lru_cache(maxsize=1)
+def load_logo() -> Image.Image | None:
+    """logo.png decoded to RGBA once per process (None if missing/unreadable)."""
     if not Path(LOGO_PATH).exists():
-        return im
+        return None
     try:
-        logo = Image.open(LOGO_PATH).convert("RGBA")
+        with Image.open(LOGO_PATH) as logo:
+            return logo.convert("RGBA")
     except Exception as e:
         logging.error(f"Failed to open logo: {e}")
-        return im
+        return None
 
+@functools.lru_cache(maxsize=32)
+def logo_for_width(lw: int) -> Image.Image | None:
+    """Logo resized to lw px wide; only a handful of widths occur in practice."""
+    logo = load_logo()
+    if logo is None:
+        return None
+    lh = int(max(1, logo.height * (lw / logo.width)))
+    return logo.resize((lw, lh), Image.LANCZOS)
+
+def overlay_logo(im: Image.Image) -> Image.Image:
+    """Overlay logo top-right with adaptive size."""
     pw, ph = im.size
-    lw_ratio = LOGO_MIN_WIDTH_RATIO if pw < 600 else LOGO_MAX_WIDTH_RATIO
-    lw = int(max(1, min(pw - 2 * LOGO_MARGIN, pw * lw_ratio)))
-    ratio = lw / logo.width
-    lh = int(max(1, logo.height * ratio))
-    logo_resized = logo.resize((lw, lh), Image.LANCZOS)
+    lw = logo_width(pw)
+    logo_resized = logo_for_width(lw)
+    if logo_resized is None:
+        return im
 
     x = pw - lw - LOGO_MARGIN
     y = LOGO_MARGIN
-    im.paste(logo_resized, (x, y), logo_resized)
+    if im.mode == "RGBA":
+        im.alpha_composite(logo_resized, (x, y))
+    else:
+        im.paste(logo_resized, (x, y), logo_resized)  # RGB: logo alpha as mask
     return im
 
-def process_image_with_logo(url: str) -> BytesIO | None:
+@functools.lru_cache(maxsize=1)
+def vips_logo():
+    """Decoded sRGB+alpha logo, loaded once per process (None if missing/unreadable)."""
+    if not Path(LOGO_PATH).exists():
+        return None
+    try:
+        logo = pyvips.Image.new_from_file(LOGO_PATH).colourspace("srgb")
+        if not logo.hasalpha():
+            logo = logo.bandjoin(255)
+        return logo.copy_memory()
+    except Exception as e:  # pyvips.Error on a corrupt/unsupported file
+        logging.error(f"Failed to open logo: {e}")
+        return None
+
+@functools.lru_cache(maxsize=32)
+def vips_logo_for_width(lw: int):
+    logo = vips_logo()
+    if logo is None:
+        return None
+    return logo.resize(lw / logo.width, kernel="lanczos3").copy_memory()
+
+def header_allowed(data: bytes, url: str = "") -> bool:
+    """
+    The Pillow path's guards, header-only, for the libvips path: format in
+    IMAGE_FORMATS and at most Image.MAX_IMAGE_PIXELS.
     """
-    - download
+    try:
+        with Image.open(BytesIO(data), formats=IMAGE_FORMATS) as im:
+            w, h = im.size
+    except Exception as e:
+        logging.error(f"image rejected for {url}: {e}")
+        return False
+    if w * h > Image.MAX_IMAGE_PIXELS:
+        logging.error(f"image rejected for {url}: {w}x{h} exceeds {Image.MAX_IMAGE_PIXELS} pixels")
+        return False
+    return True
+
+def process_image_with_logo_vips(data: bytes) -> BytesIO:
+    """libvips pipeline: shrink-on-load + autorotate, composite, JPEG/WEBP."""
+    im = pyvips.Image.thumbnail_buffer(data, MAX_IMAGE_WIDTH, height=MAX_IMAGE_HEIGHT, size="down")
+    im = im.colourspace("srgb")
+
+    lw = logo_width(im.width)
+    logo_resized = vips_logo_for_width(lw)
+    if logo_resized is not None:
+        im = im.composite2(logo_resized, "over", x=im.width - lw - LOGO_MARGIN, y=LOGO_MARGIN)
+
+    if im.hasalpha():
+        im = im[:3]  # same as Pillow's convert("RGB"): drop alpha
+    if is_jpeg(data):
+        return BytesIO(im.write_to_buffer(".jpg", Q=JPEG_QUALITY, optimize_coding=True, interlace=True))
+    return BytesIO(im.write_to_buffer(".webp", Q=WEBP_QUALITY, effort=4))
+
+def fits_as_is(data: bytes) -> bool:
+    """Header-only check: still image Telegram takes as-is, inside the size box, no EXIF rotation."""
+    try:
+        with Image.open(BytesIO(data), formats=("JPEG", "PNG", "WEBP")) as im:
+            w, h = im.size
+            orientation = im.getexif().get(0x0112, 1)
+            animated = getattr(im, "is_animated", False)
+    except Exception:
+        return False
+    return w <= MAX_IMAGE_WIDTH and h <= MAX_IMAGE_HEIGHT and orientation == 1 and not animated
+
+def composite_image(data: bytes, url: str = "") -> BytesIO | None:
+    """
+    CPU side (blocking, run in a worker thread):
     - exif transpose
     - smart downscale
     - overlay logo
-    - export JPEG
+    - export: JPEG sources stay (progressive) JPEG, anything else -> WEBP
+    Uses libvips when pyvips is installed, Pillow otherwise.
+    With no logo to overlay and nothing to shrink, the original bytes are
+    uploaded untouched (no decode/re-encode).
     """
-    base = fetch_image(url)
+    if PYVIPS_AVAILABLE:
+        if not header_allowed(data, url):
+            return None
+        if vips_logo() is None and fits_as_is(data):
+            return BytesIO(data)
+        try:
+            return process_image_with_logo_vips(data)
+        except Exception as e:
+            logging.error(f"vips processing failed for {url}: {e}")
+            return None
+
+    if load_logo() is None and fits_as_is(data):
+        return BytesIO(data)
+
+    base = open_image(data, url)
     if base is None:
         return None
 
     base = downscale_to_fit(base)
     base = overlay_logo(base)
 
+    if base.mode != "RGB":
+        base = base.convert("RGB")
     out = BytesIO()
-    base.convert("RGB").save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    if is_jpeg(data):
+        base.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        base.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
     out.seek(0)
     return out
 
+@functools.lru_cache(maxsize=1)
+def img_cache_key() -> bytes:
+    """Digest of logo.png + output settings: changing either misses the cache."""
+    try:
+        logo = Path(LOGO_PATH).read_bytes()
+    except OSError:
+        logo = b""
+    settings = (LOGO_MIN_WIDTH_RATIO, LOGO_MAX_WIDTH_RATIO, LOGO_MARGIN,
+                MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT, JPEG_QUALITY, WEBP_QUALITY, PYVIPS_AVAILABLE)
+    return hashlib.blake2b(logo + repr(settings).encode("utf-8"), digest_size=16).digest()
+
+def img_cache_path(url: str) -> Path:
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8, key=img_cache_key())
+    return IMG_CACHE_DIR / f"{digest.hexdigest()}.img"
+
+def composite_and_cache(data: bytes, url: str) -> bytes | None:
+    out = composite_image(data, url)
+    if out is None:
+        return None
+    body = out.getvalue()
+    try:
+        # A cache entry is disposable: no fsync on the send path
+        atomic_write_bytes(img_cache_path(url), body, fsync=False)
+    except Exception as e:
+        logging.error(f"image cache write failed for {url}: {e}")
+    return body
+
+def evict_img_cache():
+    """Once per run: drop cached images older than IMG_CACHE_MAX_AGE."""
+    if not IMG_CACHE_DIR.exists():
+        return
+    cutoff = datetime.now().timestamp() - IMG_CACHE_MAX_AGE
+    for entry in os.scandir(IMG_CACHE_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            continue
+
+async def _process_image(session: aiohttp.ClientSession, url: str) -> bytes | None:
+    try:
+        return img_cache_path(url).read_bytes()
+    except FileNotFoundError:
+        pass
+    data = await download_image(session, url)
+    if data is None:
+        return None
+    return await asyncio.to_thread(composite_and_cache, data, url)
+
+# In-flight work per source URL: album items sharing an image share one task
+_img_tasks: dict[str, asyncio.Task] = {}
+
+async def process_image_with_logo(session: aiohttp.ClientSession, url: str) -> BytesIO | None:
+    """
+    Cached result if this URL was processed before (.img_cache, restored by
+    the workflow); otherwise download on the event loop, composite/encode
+    (and cache) in a worker thread. Each caller gets its own BytesIO.
+    """
+    task = _img_tasks.get(url)
+    if task is None:
+        task = _img_tasks[url] = asyncio.ensure_future(_process_image(session, url))
+    body = await task
+    return BytesIO(body) if body is not None else None
+
 
 # ====================
 # Persist Daily (Crunchyroll)
 # ====================
+def record_fingerprint(rec: dict) -> str:
+    """Dedup fingerprint of a stored daily record (matches get_entry_identity)."""
+    return f"{(rec.get('title') or '').strip()}|{(rec.get('image') or '').strip()}"
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter persisted as raw bits.
+    Positions come from double hashing one blake2b digest: (h1 + i*h2) % m.
+    A miss means "definitely not added"; a hit means "probably added".
+    """
+
+    def __init__(self, path: Path, capacity: int, error_rate: float):
+        self.path = path
+        self.m = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        nbytes = (self.m + 7) // 8
+        raw = path.read_bytes() if path.exists() else b""
+        # A missing or resized file starts empty; callers re-seed it
+        self.fresh = len(raw) != nbytes
+        self.bits = bytearray(nbytes) if self.fresh else bytearray(raw)
+        self.dirty = False
+
+    def _positions(self, key: str):
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for p in self._positions(key):
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False  # first zero bit: definitely new (the common case)
+        return True
+
+    def add(self, key: str):
+        bits = self.bits
+        for p in self._positions(key):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.dirty = True
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.dirty = True
+
+    def save(self):
+        """Queue the bit array for flush_pending()."""
+        if self.dirty:
+            _pending_writes[self.path] = bytes(self.bits)
+            self.dirty = False
+
+_blooms: dict[Path, BloomFilter] = {}
+
+def get_bloom(path: Path, capacity: int, error_rate: float) -> BloomFilter:
+    bloom = _blooms.get(path)
+    if bloom is None:
+        bloom = _blooms[path] = BloomFilter(path, capacity, error_rate)
+    return bloom
+
+@functools.lru_cache(maxsize=1)
+def load_sent_video_ids() -> set[str]:
+    """sent_videos.txt as a set, read once per process."""
+    if not YOUTUBE_SENT_FILE.exists():
+        return set()
+    # One bytes read; split() drops blank lines and surrounding whitespace
+    return {vid.decode("utf-8") for vid in YOUTUBE_SENT_FILE.read_bytes().split()}
+
+def get_yt_sent_bloom() -> BloomFilter:
+    """Sent video ids; a new filter is seeded from sent_videos.txt."""
+    bloom = get_bloom(YT_SENT_BLOOM_PATH, YT_SENT_BLOOM_CAPACITY, YT_SENT_BLOOM_ERROR_RATE)
+    if bloom.fresh:
+        for vid in load_sent_video_ids():
+            bloom.add(vid)
+        bloom.fresh = False
+    return bloom
+
+def save_blooms():
+    for bloom in _blooms.values():
+        bloom.save()
+
+class DailyStore:
+    """
+    In-memory cache of one day's file, kept for the lifetime of the process.
+    - contains(): the day file is mmap-scanned for the title; only if it
+      is there is the day loaded (records/seen) once for the exact check
+    - add(): keeps the record in memory; commit_journal() appends the batch
+      to DD-MM.jsonl (O(new), not O(day))
+    - flush(): consolidates into DD-MM.json once per run, drops the journal
+    A journal left behind by an interrupted run is replayed on load.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.journal = path.with_suffix(".jsonl")
+        self.records = None
+        self.seen = None
+        self.unloaded = []  # records added before load()
+        self.unloaded_fps = set()
+        self.unjournaled = []
+        self.dirty = False
+
+        # The title scan only covers DD-MM.json: a journal left by an
+        # interrupted run may hold unsaved keys, so load eagerly then
+        if self.journal.exists():
+            self.load()
+
+    def load(self):
+        if self.records is not None:
+            return
+        self.records = load_json_list(self.path)
+        self.seen = set(map(record_fingerprint, self.records))
+
+        # One pass over journal lines + records added before load
+        for rec in itertools.chain(self._replay_journal(), self.unloaded):
+            fp = record_fingerprint(rec)
+            if fp not in self.seen:
+                self.records.append(rec)
+                self.seen.add(fp)
+                self.dirty = True
+        self.unloaded = []
+        self.unloaded_fps = set()
+
+    def _file_may_contain(self, fp: str) -> bool:
+        """Byte scan of the day file for fp's JSON-escaped title; False = definitely absent."""
+        if self.path in _pending_writes:
+            return True
+        needle = json_dumps(fp.rsplit("|", 1)[0], pretty=False)[1:-1]
+        if not needle:
+            return True
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm.find(needle) != -1
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):  # e.g. empty file: let load() decide
+            return True
+
+    def _replay_journal(self):
+        if not self.journal.exists():
+            return
+        for line in self.journal.read_bytes().splitlines():
+            try:
+                yield json_loads(line)
+            except Exception:
+                continue
+
+    def contains(self, fp: str) -> bool:
+        if self.records is None:
+            if fp in self.unloaded_fps:
+                return True
+            if not self._file_may_contain(fp):
+                return False
+        self.load()
+        return fp in self.seen
+
+    def add(self, rec: dict, fp: str):
+        if self.records is None:
+            self.unloaded.append(rec)
+            self.unloaded_fps.add(fp)
+        else:
+            self.records.append(rec)
+            self.seen.add(fp)
+        self.unjournaled.append(rec)
+
+    def commit_journal(self):
+        if not self.unjournaled:
+            return
+        with open(self.journal, "ab") as f:
+            f.write(b"".join(json_dumps(r, pretty=False) + b"\n" for r in self.unjournaled))
+        self.unjournaled = []
+        self.dirty = True
+
+    def flush(self):
+        if not self.dirty:
+            return
+        self.load()
+        try:
+            atomic_write_bytes(self.path, json_dumps(self.records))
+        except Exception as e:
+            logging.error(f"Failed writing {self.path}: {e}")
+            return
+        self.journal.unlink(missing_ok=True)
+        self.dirty = False
+
+# Keyed by day path, so a run that crosses midnight gets a fresh store
+# for the new day while the old one still flushes to its own file.
+_daily_cache: dict[Path, DailyStore] = {}
+
+def get_daily_store(path: Path) -> DailyStore:
+    store = _daily_cache.get(path)
+    if store is None:
+        store = _daily_cache[path] = DailyStore(path)
+    return store
+
+def flush_daily_stores():
+    """Write each dirty day file once, then drop its journal."""
+    for store in _daily_cache.values():
+        store.commit_journal()
+        store.flush()
+
 def save_full_news_of_today(entries):
     """
     Build today's records (no id/author/published/language/url).
-    Dedup by (title + image).
-    Return (added_records, day_path_str).
+    Dedup by (title + image) against the cached DailyStore.
+    Return (added_records, day_path_str, day) — day is the date the file
+    belongs to, so later steps don't re-read the clock (midnight).
     """
-    today = now_local()
-    path = daily_path(today)
-    existing = load_json_list(path)
-
-    existing_fp = {f"{(x.get('title') or '').strip()}|{(x.get('image') or '').strip()}" for x in existing}
+    day = now_local()
+    path = daily_path(day)
+    store = get_daily_store(path)
 
     added = []
     for e in entries:
-        fp = get_entry_identity(e)
-        if fp in existing_fp:
+        # Cheap probe first: duplicates never reach text extraction.
+        # The entry HTML is looked up once and shared by both extractors.
+        raw = entry_html(e)
+        image = extract_image(e, raw)
+        fp = get_entry_identity(e, image)
+        if store.contains(fp):
             continue
-        rec = build_daily_record(e)
-        existing.append(rec)
+        rec = build_daily_record(e, image, raw)
+        store.add(rec, fp)
         added.append(rec)
-        existing_fp.add(fp)
 
-    if added:
-        save_json_list(path, existing)
-    return added, str(path)
+    store.commit_journal()
+    return added, str(path), day
 
 
 # ====================
 # Manifests (month/year)
 # ====================
+def load_manifest(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    try:
+        data = json_loads(path.read_bytes())
+        return data if isinstance(data, dict) else None
+    except Exception as e:
+        logging.error(f"Failed reading {path}: {e}")
+        return None
+
+def insert_desc(mapping: dict, key: str, value) -> dict:
+    """
+    Insert key into a dict kept in descending key order (the manifest
+    layout): bisect for the slot instead of re-sorting every key.
+    """
+    mapping.pop(key, None)
+    items = list(mapping.items())
+    idx = len(items) - bisect.bisect_left([k for k, _ in reversed(items)], key)
+    items.insert(idx, (key, value))
+    return dict(items)
+
 def update_month_manifest(dt: datetime):
+    """
+    Steady state is O(1): if today's key is already listed, nothing is
+    touched. A new day is added as one key; the directory is only globbed
+    when the manifest is missing or unreadable.
+    """
     y, m = dt.year, dt.month
     month_dir = DATA_BASE / f"{y}" / f"{m:02d}"
     ensure_dir(month_dir)
     manifest_path = month_dir / "month_manifest.json"
 
-    days = {}
-    for p in sorted(month_dir.glob("*.json")):
-        if p.name == "month_manifest.json":
-            continue
-        day_key = p.stem  # "DD-MM"
-        days[day_key.split("-")[0]] = str(p.as_posix())
+    day_key = f"{dt.day:02d}"
+    manifest = load_manifest(manifest_path)
+    if manifest is not None and day_key in (manifest.get("days") or {}):
+        return
+
+    if manifest is None:
+        days = {}
+        for p in sorted(month_dir.glob("*.json")):
+            if p.name == "month_manifest.json":
+                continue
+            day_key = p.stem  # "DD-MM"
+            days[day_key.split("-")[0]] = str(p.as_posix())
+        days = dict(sorted(days.items(), key=lambda kv: kv[0], reverse=True))
+    else:
+        day_file = month_dir / f"{day_key}-{m:02d}.json"
+        if not day_file.exists():
+            return
+        days = insert_desc(manifest.get("days") or {}, day_key, str(day_file.as_posix()))
 
     manifest = {
         "year": str(y),
         "month": f"{m:02d}",
-        "days": dict(sorted(days.items(), key=lambda kv: kv[0], reverse=True))
+        "days": days
     }
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    atomic_write_bytes(manifest_path, json_dumps(manifest))
 
 def update_year_manifest(dt: datetime):
+    """Same incremental scheme as update_month_manifest, keyed by month."""
     y = dt.year
     year_dir = DATA_BASE / f"{y}"
     ensure_dir(year_dir)
     manifest_path = year_dir / "year_manifest.json"
 
-    months = {}
-    for p in sorted(year_dir.glob("[0-1][0-9]")):
-        m = p.name
-        months[m] = f"{(p / 'month_manifest.json').as_posix()}"
+    month_key = f"{dt.month:02d}"
+    manifest = load_manifest(manifest_path)
+    if manifest is not None and month_key in (manifest.get("months") or {}):
+        return
+
+    if manifest is None:
+        months = {}
+        for p in sorted(year_dir.glob("[0-1][0-9]")):
+            m = p.name
+            months[m] = f"{(p / 'month_manifest.json').as_posix()}"
+        months = dict(sorted(months.items(), key=lambda kv: kv[0], reverse=True))
+    else:
+        months = insert_desc(manifest.get("months") or {}, month_key,
+                             f"{(year_dir / month_key / 'month_manifest.json').as_posix()}")
 
     manifest = {
         "year": str(y),
-        "months": dict(sorted(months.items(), key=lambda kv: kv[0], reverse=True))
+        "months": months
     }
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    atomic_write_bytes(manifest_path, json_dumps(manifest))
 
 
 # ====================
@@ -333,18 +980,17 @@ def gi_paths():
 
 def gi_load_pagination():
     pag_path, _ = gi_paths()
-    if not pag_path.exists():
+    raw = _pending_writes.get(pag_path)
+    if raw is None and not pag_path.exists():
         return {"total_articles": 0, "files": []}
     try:
-        with open(pag_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return json_loads(raw if raw is not None else pag_path.read_bytes())
     except Exception:
         return {"total_articles": 0, "files": []}
 
 def gi_save_pagination(pag: dict):
     pag_path, _ = gi_paths()
-    with open(pag_path, "w", encoding="utf-8") as f:
-        json.dump(pag, f, ensure_ascii=False, indent=2)
+    queue_json(pag_path, pag)
 
 def gi_save_stats(total_articles: int, added_today: int):
     _, stats_path = gi_paths()
@@ -353,30 +999,32 @@ def gi_save_stats(total_articles: int, added_today: int):
         "added_today": added_today,
         "last_update": now_local().isoformat()
     }
-    with open(stats_path, "w", encoding="utf-8") as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    queue_json(stats_path, stats)
+
+class Slim(msgspec.Struct):
+    """Slim global-index record (field order = JSON key order)."""
+    title: str | None
+    image: str | None
+    categories: list[str]
+    path: str | None
 
 def convert_full_to_slim(records: list, source_path: str = None) -> list:
     """
     From daily records to slim records for global index:
     Keep: title, image, categories, path (points to data/YYYY/MM/DD-MM.json#idx)
     """
-    out = []
-    for i, r in enumerate(records):
-        path = f"{source_path}#{i}" if source_path else None
-        out.append({
-            "title": r.get("title"),
-            "image": r.get("image"),
-            "categories": r.get("categories") or [],
-            "path": path
-        })
-    return out
+    return [
+        Slim(r.get("title"), r.get("image"), r.get("categories") or [],
+             f"{source_path}#{i}" if source_path else None)
+        for i, r in enumerate(records)
+    ]
 
 def gi_append_records(new_records: list):
     """
     Append slim records into global index with pagination support.
     - Create/rotate index_N.json files at GLOBAL_PAGE_SIZE
     - Update pagination.json and stats.json
+    - All three are queued: one atomic write each in flush_pending()
     """
     if not new_records:
         return
@@ -385,27 +1033,21 @@ def gi_append_records(new_records: list):
 
     # Ensure first index file exists
     if not pag["files"]:
-        first = GLOBAL_INDEX / "index_1.json"
-        save_json_list(first, [])
         pag["files"].append("index_1.json")
 
     # Open current file
-    current_filename = pag["files"][-1]
-    current_file = GLOBAL_INDEX / current_filename
+    current_file = GLOBAL_INDEX / pag["files"][-1]
     items = load_json_list(current_file)
 
     # If current file is full, rotate to a new one
     if len(items) >= GLOBAL_PAGE_SIZE:
-        next_idx = len(pag["files"]) + 1
-        current_filename = f"index_{next_idx}.json"
-        current_file = GLOBAL_INDEX / current_filename
-        save_json_list(current_file, [])
-        pag["files"].append(current_filename)
+        pag["files"].append(f"index_{len(pag['files']) + 1}.json")
+        current_file = GLOBAL_INDEX / pag["files"][-1]
         items = []
 
-    # Append new records to current page
-    items.extend(new_records)
-    save_json_list(current_file, items)
+    # Append new records to current page (Slim structs -> dicts for json_dumps)
+    items.extend(msgspec.to_builtins(new_records))
+    queue_json(current_file, items)
 
     # Update counters
     total = (pag.get("total_articles") or 0) + len(new_records)
@@ -416,13 +1058,99 @@ def gi_append_records(new_records: list):
     gi_save_stats(total_articles=total, added_today=len(new_records))
 
 
+# ====================
+# Feed fetching (shared session, parse off the event loop)
+# ====================
+_feed_validators: dict | None = None
+_staged_validators: dict = {}
+
+def get_feed_validators() -> dict:
+    global _feed_validators
+    if _feed_validators is None:
+        try:
+            _feed_validators = json_loads(FEED_VALIDATORS_PATH.read_bytes())
+        except Exception:
+            _feed_validators = {}
+    return _feed_validators
+
+def conditional_headers(url: str) -> dict:
+    """
+    If-None-Match / If-Modified-Since from the last 200 for url.
+    Only reused on the same local day: the first run of a day must see
+    the full feed to snapshot it into the new daily file.
+    """
+    v = get_feed_validators().get(url)
+    if not v or v.get("day") != now_local().date().isoformat():
+        return {}
+    headers = {}
+    if v.get("etag"):
+        headers["If-None-Match"] = v["etag"]
+    if v.get("last_modified"):
+        headers["If-Modified-Since"] = v["last_modified"]
+    return headers
+
+def commit_feed_validators(url: str):
+    """Persist what fetch_bytes staged for url, once its body has been handled."""
+    v = _staged_validators.pop(url, None)
+    if v is None:
+        return
+    validators = get_feed_validators()
+    validators[url] = v
+    queue_json(FEED_VALIDATORS_PATH, validators)
+
+async def fetch_bytes(session: aiohttp.ClientSession, url: str) -> bytes | None:
+    """Conditional GET; None on 304 Not Modified, b"" on error."""
+    try:
+        async with session.get(url, headers=conditional_headers(url)) as r:
+            if r.status == 304:
+                logging.info(f"not modified: {url}")
+                return None
+            r.raise_for_status()
+            body = await r.read()
+            if r.headers.get("ETag") or r.headers.get("Last-Modified"):
+                _staged_validators[url] = {
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "day": now_local().date().isoformat(),
+                }
+            return body
+    except Exception as e:
+        logging.error(f"fetch failed for {url}: {e}")
+        return b""
+
+
 # ====================
 # Telegram Senders
 # ====================
-async def send_crunchyroll_album(bot: telegram.Bot, added_records: list):
+class OrjsonRequest(HTTPXRequest):
+    """HTTPXRequest that parses Telegram's JSON replies with orjson (when installed)."""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> dict:
+        if not ORJSON_AVAILABLE:
+            return HTTPXRequest.parse_json_payload(payload)
+        try:
+            return orjson.loads(payload)
+        except ValueError:
+            # e.g. invalid UTF-8: PTB's parser decodes with errors="replace"
+            return HTTPXRequest.parse_json_payload(payload)
+
+_bot: telegram.Bot | None = None
+
+def get_bot() -> telegram.Bot:
+    """One Bot (and one pooled HTTPX client) per process."""
+    global _bot
+    if _bot is None:
+        request = OrjsonRequest(connection_pool_size=8, connect_timeout=HTTP_CONNECT_TIMEOUT)
+        # The bot never polls, so the get_updates slot shares the same client
+        _bot = telegram.Bot(token=TELEGRAM_TOKEN, request=request, get_updates_request=request)
+    return _bot
+
+async def send_crunchyroll_album(bot: telegram.Bot, session: aiohttp.ClientSession,
+                                 added_records: list):
     """
     Send up to 4 new items:
-    - >=2 images: media group (album) with logo
+    - >=2 images: media group (album) with logo (by URL if LOGO_ENABLED is off)
     - 1 image: a single photo with logo
     - 0 images: text list of titles
     (no links)
@@ -431,22 +1159,19 @@ async def send_crunchyroll_album(bot: telegram.Bot, added_records: list):
         return
 
     candidates = added_records[:4]
-    media_list = []
+    sem = asyncio.Semaphore(ALBUM_CONCURRENCY)
 
-    for rec in candidates:
-        img_url = rec.get("image")
-        title   = rec.get("title") or ""
-        if not img_url:
-            continue
-
-        processed = process_image_with_logo(img_url)
-        if processed:
-            media_list.append(InputMediaPhoto(media=processed, caption=title))
-        else:
-            media_list.append(InputMediaPhoto(media=img_url, caption=title))
+    async def prepare(rec: dict) -> InputMediaPhoto:
+        img_url = rec["image"]
+        if not LOGO_ENABLED:
+            return InputMediaPhoto(media=img_url, caption=rec.get("title") or "")
+        async with sem:
+            processed = await process_image_with_logo(session, img_url)
+        # Logo failed → let Telegram fetch the original URL
+        return InputMediaPhoto(media=processed or img_url, caption=rec.get("title") or "")
 
-        if len(media_list) >= 4:
-            break
+    # Images are prepared concurrently; gather keeps the feed order
+    media_list = await asyncio.gather(*(prepare(rec) for rec in candidates if rec.get("image")))
 
     if len(media_list) >= 2:
         try:
@@ -465,40 +1190,36 @@ async def send_crunchyroll_album(bot: telegram.Bot, added_records: list):
             logging.error(f"send_photo(single) failed: {e}")
 
     # No images → text only fallback
-    lines = [f"• {rec.get('title')}" for rec in candidates]
-    text = "📰 أحدث أخبار الأنمي\n\n" + "\n".join(lines)
-    await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=text)
+    text = ALBUM_TEXT_HEADER + "\n".join(f"• {rec.get('title')}" for rec in candidates)
+    try:
+        await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=text)
+    except Exception as e:
+        logging.error(f"send_message(text) failed: {e}")
 
 
-async def send_youtube_if_new(bot: telegram.Bot):
+async def send_youtube_if_new(bot: telegram.Bot, entry: dict | None) -> bool:
     """
-    Send latest YouTube video if new:
+    Send latest YouTube video (the feed's first entry) if new:
     - no data/ storage
-    - prepend id to sent_videos.txt
+    - "already sent?": Bloom miss = new; a hit is confirmed against
+      sent_videos.txt, so a false positive never drops a video
+    - append id to sent_videos.txt (oldest first)
+    Returns False only when the send failed.
     """
-    feed = feedparser.parse(YOUTUBE_RSS_URL)
-    if not feed.entries:
-        return
+    if not entry:
+        return True
 
-    entry = feed.entries[0]
-    vid = getattr(entry, "yt_videoid", None) or getattr(entry, "id", None)
-    title = getattr(entry, "title", "")
-    url   = getattr(entry, "link", "")
-    thumb = None
-    if hasattr(entry, "media_thumbnail") and entry.media_thumbnail:
-        thumb = entry.media_thumbnail[0].get("url")
+    vid = entry.get("yt_videoid") or entry.get("id")
+    title = entry.get("title", "")
+    url   = entry.get("link", "")
+    mt = entry.get("media_thumbnail")
+    thumb = mt[0].get("url") if mt else None
 
-    if not YOUTUBE_SENT_FILE.exists():
-        YOUTUBE_SENT_FILE.write_text("", encoding="utf-8")
-        last = None
-    else:
-        with open(YOUTUBE_SENT_FILE, "r", encoding="utf-8") as f:
-            last = f.readline().strip() or None
-
-    if last and vid and vid == last:
-        return
+    sent = get_yt_sent_bloom()
+    if vid and vid in sent and vid in load_sent_video_ids():
+        return True
 
-    caption = f"🎥 {title}\n{url}"
+    caption = YOUTUBE_CAPTION.format(title=title, url=url)
     try:
         if thumb:
             await bot.send_photo(chat_id=TELEGRAM_CHAT_ID, photo=thumb, caption=caption)
@@ -506,53 +1227,130 @@ async def send_youtube_if_new(bot: telegram.Bot):
             await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=caption)
     except Exception as e:
         logging.error(f"Failed to send YouTube: {e}")
-        return
+        return False
+
+    if vid:
+        sent.add(vid)
+        load_sent_video_ids().add(vid)
 
-    # prepend id for next runs
+    # append id for next runs (O(1), no read)
     try:
-        old = ""
-        if YOUTUBE_SENT_FILE.exists():
-            old = YOUTUBE_SENT_FILE.read_text(encoding="utf-8")
-        with open(YOUTUBE_SENT_FILE, "w", encoding="utf-8") as f:
+        with open(YOUTUBE_SENT_FILE, "a", encoding="utf-8") as f:
             f.write((vid or "") + "\n")
-            if old:
-                f.write(old)
     except Exception as e:
         logging.error(f"Failed updating {YOUTUBE_SENT_FILE}: {e}")
+    return True
+
+def trim_sent_videos():
+    """
+    Once per run: keep the newest YOUTUBE_SENT_KEEP ids when the file is too
+    big, and rebuild yt_sent.bloom from them so it never fills up.
+    """
+    try:
+        if not YOUTUBE_SENT_FILE.exists() or YOUTUBE_SENT_FILE.stat().st_size <= YOUTUBE_SENT_MAX_BYTES:
+            return
+        tail = YOUTUBE_SENT_FILE.read_bytes().splitlines()[-YOUTUBE_SENT_KEEP:]
+        atomic_write_bytes(YOUTUBE_SENT_FILE, b"\n".join(tail) + b"\n")
+    except Exception as e:
+        logging.error(f"Failed trimming {YOUTUBE_SENT_FILE}: {e}")
+        return
+    bloom = get_yt_sent_bloom()
+    bloom.clear()
+    for vid in tail:
+        if vid.strip():
+            bloom.add(vid.strip().decode("utf-8"))
 
 
 # ====================
 # Main
 # ====================
+def update_archive(added_records: list, day_path: str, day: datetime):
+    """Consolidate the day's file, then manifests, then the global index (in order)."""
+    # The day's journal must land in DD-MM.json before the manifests look for it
+    flush_daily_stores()
+
+    # Manifests follow the file's day, not the clock: a run crossing
+    # midnight must still list the day it wrote
+    update_month_manifest(day)
+    update_year_manifest(day)
+
+    # Update global_index (slim records with path)
+    slim = convert_full_to_slim(added_records, day_path)
+    gi_append_records(slim)
+
 async def run():
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         logging.error("FATAL: TELEGRAM_TOKEN or TELEGRAM_CHAT_ID not set.")
         return
 
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-
-    # 1) Crunchyroll: fetch, save today, send 4 max, update manifests & global index
-    news_feed = feedparser.parse(CRUNCHYROLL_RSS_URL)
-    if news_feed.entries:
-        added_records, day_path = save_full_news_of_today(news_feed.entries)
-        logging.info(f"Crun: added {len(added_records)} new record(s) to {day_path}")
-
-        # Send up to 4 new items (title + image with logo)
-        await send_crunchyroll_album(bot, added_records)
-
-        # Update manifests
-        today = now_local()
-        update_month_manifest(today)
-        update_year_manifest(today)
+    bot = get_bot()
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT,
+                                    sock_read=HTTP_READ_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=8, keepalive_timeout=30)
 
-        # Update global_index (slim records with path)
-        slim = convert_full_to_slim(added_records, day_path)
-        gi_append_records(slim)
-    else:
+    try:
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+            # Both sources fetch + process concurrently on one session. They
+            # start before the Bot's initialize (TLS to api.telegram.org +
+            # get_me), so it overlaps the feed downloads
+            tasks = [
+                asyncio.create_task(run_crunchyroll(bot, session)),
+                asyncio.create_task(run_youtube(bot, session)),
+            ]
+            try:
+                async with bot:
+                    await asyncio.gather(*tasks)
+            finally:
+                # Never leave a pipeline running past the session or the flush
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # Bot.shutdown() is a no-op when initialize() failed; close the
+                # pooled HTTPX client ourselves (idempotent once it is closed)
+                await bot.request.shutdown()
+    finally:
+        # One batched commit for everything queued during the run
+        flush_daily_stores()
+        save_blooms()
+        flush_pending()
+        evict_img_cache()
+
+
+async def run_crunchyroll(bot: telegram.Bot, session: aiohttp.ClientSession):
+    """Save today, send 4 max, update manifests & global index."""
+    body = await fetch_bytes(session, CRUNCHYROLL_RSS_URL)
+    if body is None:
+        return
+    entries = await asyncio.to_thread(parse_rss_items, body)
+    if not entries:
         logging.warning("No entries in Crunchyroll feed.")
+        return
+
+    added_records, day_path, day = save_full_news_of_today(entries)
+    logging.info(f"Crun: added {len(added_records)} new record(s) to {day_path}")
 
-    # 2) YouTube (send-only, save ID)
-    await send_youtube_if_new(bot)
+    # Send up to 4 new items (title + image with logo) while the
+    # disk side (day file, manifests, global index) runs in a thread
+    results = await asyncio.gather(
+        send_crunchyroll_album(bot, session, added_records),
+        asyncio.to_thread(update_archive, added_records, day_path, day),
+        return_exceptions=True,
+    )
+    # Raise only once both are done: run()'s final flush must not race a
+    # still-running update_archive (its queued writes would be lost)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    commit_feed_validators(CRUNCHYROLL_RSS_URL)
+
+
+async def run_youtube(bot: telegram.Bot, session: aiohttp.ClientSession):
+    """Send-only, save ID."""
+    body = await fetch_bytes(session, YOUTUBE_RSS_URL)
+    if body is not None:
+        # Keep the validators only if the newest video is handled, so a
+        # failed send is retried instead of hidden behind a 304
+        if await send_youtube_if_new(bot, parse_youtube_latest(body)):
+            commit_feed_validators(YOUTUBE_RSS_URL)
+    trim_sent_videos()
 
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ from datetime import datetime
 from urllib.parse import urlparse, urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 
 # --- Optional Playwright (for login / dynamic pages) ---
@@ -19,17 +21,32 @@ try:
 except Exception:
     PLAYWRIGHT_AVAILABLE = False
 
+# --- Optional lxml (C tree builder, much faster); html.parser otherwise ---
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except Exception:
+    HTML_PARSER = "html.parser"
+
 # ========= Config =========
 TZ = "Africa/Casablanca"
 BASE_SAVE = Path("data/scraped")
 SAVE_HTML_IN_JSON = False   # اجعلها True لو تريد html الخام
-TIMEOUT = 30
+TIMEOUT = (3.05, 30)        # (connect, read)
 
 # بيئة تسجيل الدخول (اختياري):
 CR_EMAIL    = os.getenv("CR_EMAIL")       # بريد كرانشي رول
 CR_PASSWORD = os.getenv("CR_PASSWORD")    # كلمة المرور
 CR_COUNTRY  = os.getenv("CR_COUNTRY", "ar-SA")  # قد لا تحتاجها
 
+# ========= HTTP session =========
+# جلسة واحدة: إعادة استخدام اتصالات keep-alive (بدون TLS handshake لكل طلب)
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                       max_retries=Retry(total=3, backoff_factor=0.3))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
 # ========= Helpers =========
 def slugify(text: str) -> str:
     text = text.strip()
@@ -52,14 +69,14 @@ def abs_url(base: str, src: str) -> str:
     return urljoin(base, src)
 
 def text_clean(html: str) -> str:
-    soup = BeautifulSoup(html or "", "html.parser")
+    soup = BeautifulSoup(html or "", HTML_PARSER)
     # إزالة سكريبت/ستايل
     for tag in soup(["script", "style", "noscript"]):
         tag.extract()
     return soup.get_text(separator=" ", strip=True)
 
 def extract_from_article_html(url: str, html: str) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, HTML_PARSER)
 
     # ---- Title ----
     title_tag = soup.find("h1") or soup.find("title")
@@ -155,7 +172,7 @@ def fetch_with_requests(url: str, cookies: dict | None = None, headers: dict | N
     if headers:
         h.update(headers)
     try:
-        r = requests.get(url, headers=h, cookies=cookies, timeout=TIMEOUT)
+        r = SESSION.get(url, headers=h, cookies=cookies, timeout=TIMEOUT)
         r.raise_for_status()
         return r.text
     except Exception as e: